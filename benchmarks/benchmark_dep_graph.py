@@ -46,14 +46,12 @@ tasks = {
 
 @pytest.mark.parametrize("test", ["iterate", "init"])
 @pytest.mark.parametrize("size", ["small", "medium", "large"])
-@pytest.mark.parametrize("block_gen", ["lazy", "enumerated"])
-def benchmark_dep_graph(benchmark, test, size, block_gen):
+def benchmark_dep_graph(benchmark, test, size):
     task = tasks[size]
-    lazy = block_gen == "lazy"
     iterate = test == "iterate"
 
     def benchmark_scheduler(task, block_count):
-        scheduler = Scheduler([task], lazy=lazy)
+        scheduler = Scheduler([task])
         for i in range(block_count):
             block = scheduler.acquire_block(task.task_id)
             assert block is not None, f"Failed to get the {i}'th block!"
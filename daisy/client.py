@@ -67,7 +67,7 @@ class Client:
     @contextmanager
     def acquire_block(self):
         """API for client to get a new block."""
-        self.tcp_client.send_message(AcquireBlock(self.task_id))
+        self.tcp_client.send_message(AcquireBlock(self.task_id, self.worker_id))
         message = None
         try:
             while message is None:
@@ -7,7 +7,6 @@ import numpy as np
 
 from itertools import product
 import logging
-import collections
 from typing import List, Optional
 
 logger = logging.getLogger(__name__)
@@ -561,8 +560,10 @@ class BlockwiseDependencyGraph:
 
 class DependencyGraph:
     def __init__(self, tasks):
-        self.upstream_tasks = collections.defaultdict(set)
-        self.downstream_tasks = collections.defaultdict(set)
+        # plain dicts: __add_task creates the entries explicitly, so reads
+        # on the hot upstream/downstream paths never allocate via a miss
+        self.upstream_tasks = {}
+        self.downstream_tasks = {}
         self.task_map = {}
         for task in tasks:
             self.__add_task(task)
@@ -2,6 +2,7 @@ from .message import Message
 
 
 class AcquireBlock(Message):
-    def __init__(self, task_id):
+    def __init__(self, task_id, worker_id=None):
         super().__init__()
         self.task_id = task_id
+        self.worker_id = worker_id
@@ -1,5 +1,15 @@
 import collections
 
+# how many times in a row the priority slot may be popped before the
+# ready queue gets a turn, to avoid starving queued blocks
+_MAX_SLOT_POPS = 256
+
+# pools of cleared containers, recycled between ProcessingQueue instances
+# to cut allocator churn on workflows with many tasks
+_MAX_POOL_SIZE = 128
+_deque_pool: list = []
+_set_pool: list = []
+
 
 class ProcessingQueue:
     """
@@ -11,24 +21,104 @@ class ProcessingQueue:
     3) how many times blocks have been retried
     """
 
-    def __init__(self, num_roots=0, root_generator=None):
-        self.ready_queue = collections.deque()
-        self.processing_blocks = set()
-        self.block_retries = collections.defaultdict(int)
+    __slots__ = (
+        "ready_queues",
+        "num_shards",
+        "processing_blocks",
+        "block_retries",
+        "ready_roots",
+        "root_generator",
+        "priority_slot",
+        "slot_pops",
+    )
+
+    def __init__(self, num_roots=0, root_generator=None, num_shards=1):
+        self.num_shards = max(num_shards, 1)
+        self.ready_queues = [
+            _deque_pool.pop() if _deque_pool else collections.deque()
+            for _ in range(self.num_shards)
+        ]
+        self.processing_blocks = _set_pool.pop() if _set_pool else set()
+        self.block_retries = {}
 
         self.ready_roots = num_roots
         self.root_generator = root_generator
 
+        self.priority_slot = None
+        self.slot_pops = 0
+
+    def __del__(self):
+        # return the containers to the pools for the next instance
+        try:
+            for ready_queue in self.ready_queues:
+                if len(_deque_pool) >= _MAX_POOL_SIZE:
+                    break
+                ready_queue.clear()
+                _deque_pool.append(ready_queue)
+            if len(_set_pool) < _MAX_POOL_SIZE:
+                self.processing_blocks.clear()
+                _set_pool.append(self.processing_blocks)
+        except Exception:
+            # attributes or module globals may already be gone during
+            # interpreter shutdown
+            pass
+
     @property
     def num_ready(self):
-        return self.ready_roots + len(self.ready_queue)
-
-    def get_next(self):
-        if self.num_ready > 0:
-            if self.ready_roots > 0:
-                self.ready_roots -= 1
-                return next(self.root_generator)
-            else:
-                return self.ready_queue.popleft()
+        return (
+            self.ready_roots
+            + sum(len(ready_queue) for ready_queue in self.ready_queues)
+            + (self.priority_slot is not None)
+        )
+
+    def __shard(self, block):
+        if self.num_shards == 1:
+            return 0
+        return hash(block.block_id) % self.num_shards
+
+    def push_ready(self, block):
+        """Make ``block`` available for scheduling. The most recently freed
+        block goes into the priority slot so it is handed out next, which
+        keeps dependent blocks close to the blocks that freed them; the
+        previous occupant is demoted to the front of its shard's queue."""
+        if self.priority_slot is None:
+            self.priority_slot = block
         else:
-            return None
+            demoted = self.priority_slot
+            self.ready_queues[self.__shard(demoted)].appendleft(demoted)
+            self.priority_slot = block
+
+    def push_retry(self, block):
+        """Requeue a failed ``block`` at the back of its shard's queue."""
+        self.ready_queues[self.__shard(block)].append(block)
+
+    def get_next(self, worker_id=None):
+        """Get the next ready block, preferring the priority slot, then
+        root blocks, then the shard associated with ``worker_id``. If that
+        shard is empty the other shards are scanned, so a worker steals
+        from its neighbors rather than idling."""
+        block = self.priority_slot
+        if block is not None:
+            if self.slot_pops < _MAX_SLOT_POPS:
+                self.slot_pops += 1
+                self.priority_slot = None
+                return block
+            # give the ready queues a turn so they are not starved
+            self.slot_pops = 0
+            self.ready_queues[self.__shard(block)].append(block)
+            self.priority_slot = None
+        if self.ready_roots > 0:
+            self.ready_roots -= 1
+            block = next(self.root_generator)
+            if self.ready_roots == 0:
+                # fully expanded; free the generator and whatever it
+                # closes over
+                self.root_generator = None
+            return block
+        num_shards = self.num_shards
+        start = worker_id % num_shards if worker_id is not None else 0
+        for i in range(num_shards):
+            ready_queue = self.ready_queues[(start + i) % num_shards]
+            if ready_queue:
+                return ready_queue.popleft()
+        return None
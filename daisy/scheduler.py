@@ -8,12 +8,39 @@ from .task import Task
 from .block import BlockStatus
 
 from typing import Any, Dict, List
-import collections
 import logging
+import queue
 
 logger = logging.getLogger(__name__)
 
 
+class TaskRecord:
+    """Everything the scheduler tracks for a single task, bundled so that
+    hot paths pay one dict lookup per task instead of one per mapping.
+    ``max_retries`` and ``check_function`` are copied off the task so the
+    per-block paths do not have to load them through it."""
+
+    __slots__ = (
+        "task",
+        "state",
+        "queue",
+        "max_retries",
+        "check_function",
+        "last_precheck_block",
+        "last_precheck_ret",
+    )
+
+    def __init__(self, task, state, queue):
+        self.task = task
+        self.state = state
+        self.queue = queue
+        self.max_retries = task.max_retries
+        self.check_function = task.check_function
+        # memoization of the last precheck, keyed by block identity
+        self.last_precheck_block = None
+        self.last_precheck_ret = False
+
+
 class Scheduler:
     """This is the main scheduler that tracks states of tasks.
 
@@ -41,20 +68,26 @@ class Scheduler:
             self.dependency_graph.downstream, self.dependency_graph.upstream
         )
 
+        # the combined per-task records; task_map, task_states and
+        # task_queues below expose the same objects per mapping
+        self._tasks: Dict[Any, TaskRecord] = {}
+
         self.task_map: Dict[Any, Task] = {}
-        self.task_states: Dict[Any, TaskState] = collections.defaultdict(TaskState)
-        self.task_queues: Dict[Any, ProcessingQueue] = collections.defaultdict(
-            ProcessingQueue
-        )
+        self.task_states: Dict[Any, TaskState] = {}
+        self.task_queues: Dict[Any, ProcessingQueue] = {}
+
+        # task_ids of tasks that currently have blocks ready to process
+        self._ready_task_ids: set = set()
+
+        # blocks reported done by other threads via report_done, drained
+        # by the scheduling thread before handing out new blocks
+        self._completed_inbox: queue.SimpleQueue = queue.SimpleQueue()
 
         # root tasks is a mapping from task_id -> (num_roots, root_generator)
         roots = self.dependency_graph.roots()
-        for task_id, (num_roots, root_gen) in roots.items():
-            self.task_states[task_id].ready_count += num_roots
-            self.task_queues[task_id] = ProcessingQueue(num_roots, root_gen)
 
         for task in tasks:
-            self.__init_task(task)
+            self.__init_task(task, roots)
 
         self.count_all_orphans = count_all_orphans
 
@@ -62,13 +95,53 @@ class Scheduler:
         """
         Get a list of tasks that currently have blocks available for scheduling
         """
-        ready_tasks = []
-        for task_id, task_state in self.task_states.items():
-            if task_state.ready_count > 0:
-                ready_tasks.append(self.task_map[task_id])
-        return ready_tasks
+        self.__drain_completed()
+        return [self._tasks[task_id].task for task_id in self._ready_task_ids]
 
-    def acquire_block(self, task_id):
+    def acquire_block_any(self, worker_id=None):
+        """
+        Get a ready block from any task that currently has one.
+
+        Intended for workers that can process blocks of any task: instead
+        of returning None when one task's queue drains, the next ready
+        task's queue is tried.
+
+        Args:
+            worker_id(``int``, optional):
+                Passed through to ``acquire_block``.
+
+        Return:
+            ``Block`` or None:
+                A block of any ready task, or None if no task has a block
+                ready.
+        """
+        while self._ready_task_ids:
+            task_id = next(iter(self._ready_task_ids))
+            block = self.acquire_block(task_id, worker_id)
+            if block is not None:
+                return block
+        return None
+
+    def report_done(self, block):
+        """
+        Hand a finished block back to the scheduler from another thread.
+
+        Unlike ``release_block``, this is safe to call from worker threads:
+        the block is parked in a queue and released by the scheduling
+        thread the next time it hands out or polls for blocks.
+
+        Args:
+            block(``Block``):
+                The finished block, with its status set.
+        """
+        self._completed_inbox.put_nowait(block)
+
+    def __drain_completed(self):
+        inbox = self._completed_inbox
+        while not inbox.empty():
+            self.release_block(inbox.get_nowait())
+
+    def acquire_block(self, task_id, worker_id=None):
         """
         Get a block that is ready to process for task with given task_id.
 
@@ -76,37 +149,45 @@ class Scheduler:
             task_id(``int``):
                 The task for which you want a block
 
+            worker_id(``int``, optional):
+                The worker requesting the block. If given, blocks are
+                preferentially handed out from the worker's locality
+                shard of the ready queue.
+
         Return:
             ``Block`` or None:
                 A block that can be run without worry of
                 conflicts.
         """
+        self.__drain_completed()
+        record = self._tasks[task_id]
+        task_state = record.state
+        task_queue = record.queue
+        has_check_function = record.check_function is not None
         while True:
-            block = self.task_queues[task_id].get_next()
-            if block is not None:
-
-                # update states
-                self.task_states[task_id].ready_count -= 1
-                self.task_states[task_id].processing_count += 1
+            block = task_queue.get_next(worker_id)
+            if block is None:
+                return None
 
-                pre_check_ret = self.__precheck(block)
-                if pre_check_ret:
-                    logger.debug(
-                        "Skipping block (%s); already processed.", block.block_id
-                    )
-                    block.status = BlockStatus.SUCCESS
-                    self.task_states[task_id].skipped_count += 1
-                    # adding block so release_block() can remove it
-                    self.task_queues[task_id].processing_blocks.add(block.block_id)
-                    self.release_block(block)
-                    continue
-                else:
-                    self.task_states[task_id].started = True
-                    self.task_queues[task_id].processing_blocks.add(block.block_id)
-                    return block
+            # update states
+            task_state.ready_count -= 1
+            task_state.processing_count += 1
+            if task_state.ready_count == 0:
+                self._ready_task_ids.discard(task_id)
 
+            pre_check_ret = has_check_function and self.__precheck(block)
+            if pre_check_ret:
+                logger.debug("Skipping block (%s); already processed.", block.block_id)
+                block.status = BlockStatus.SUCCESS
+                task_state.skipped_count += 1
+                # adding block so release_block() can remove it
+                task_queue.processing_blocks.add(block.block_id)
+                self.release_block(block)
             else:
-                return None
+                if not task_state.started:
+                    task_state.started = True
+                task_queue.processing_blocks.add(block.block_id)
+                return block
 
     def release_block(self, block):
         """
@@ -130,72 +211,149 @@ class Scheduler:
             processing, task B would be returned with its state.
         """
         task_id = block.task_id
+        record = self._tasks[task_id]
+        task_state = record.state
+        task_queue = record.queue
         self.__remove_from_processing_blocks(block)
         if block.status == BlockStatus.SUCCESS:
             new_blocks = self.ready_surface.mark_success(block)
-            self.task_states[block.task_id].completed_count += 1
+            task_state.completed_count += 1
             updated_tasks = self.__update_ready_queue(new_blocks)
             return updated_tasks
         if block.status == BlockStatus.FAILED:
-            if (
-                self.task_queues[task_id].block_retries[block.block_id]
-                >= self.task_map[task_id].max_retries
-            ):
+            retries = task_queue.block_retries.get(block.block_id, 0)
+            if retries >= record.max_retries:
                 logger.debug("Marking %s as permanently failed", block)
                 orphans = self.ready_surface.mark_failure(
                     block, count_all_orphans=self.count_all_orphans
                 )
                 logger.debug("Number of orphans is %d", len(orphans))
-                self.task_states[block.task_id].failed_count += 1
+                task_state.failed_count += 1
                 for orphan in orphans:
-                    self.task_states[orphan.task_id].orphaned_count += 1
+                    orphan_state = self._tasks[orphan.task_id].state
+                    orphan_state.orphaned_count += 1
+                    orphan_state.pending_count -= 1
                 return {}
             else:
                 logger.debug("Marking %s as temporarily failed", block)
-                self.__queue_ready_block(block)
-                self.task_queues[task_id].block_retries[block.block_id] += 1
-                return {task_id: self.task_states[task_id]}
+                self.__queue_ready_block(block, retry=True)
+                task_queue.block_retries[block.block_id] = retries + 1
+                return {task_id: task_state}
         else:
             raise RuntimeError(
                 f"Unexpected status for released block: {block.status} {block}"
             )
 
-    def __init_task(self, task):
-        if task.task_id not in self.task_map:
-            self.task_map[task.task_id] = task
-            num_blocks = self.dependency_graph.num_blocks(task.task_id)
-            self.task_states[task.task_id].total_block_count = num_blocks
+    def release_blocks(self, blocks):
+        """
+        Release several blocks at once.
+
+        Equivalent to calling ``release_block`` for each block, but blocks
+        made ready by the successful blocks are grouped by task first, so
+        the per-task bookkeeping is paid once per task instead of once per
+        block.
+
+        Args:
+            blocks(``list`` of ``Block``):
+                The blocks to release.
+
+        Return:
+            ``dict``(``task_id`` -> ``TaskState``):
+            The tasks whose state changed, as in ``release_block``.
+        """
+        updated_tasks = {}
+        ready_by_task: Dict[Any, List] = {}
+        for block in blocks:
+            if block.status == BlockStatus.SUCCESS:
+                record = self._tasks[block.task_id]
+                self.__remove_from_processing_blocks(block)
+                record.state.completed_count += 1
+                for ready_block in self.ready_surface.mark_success(block):
+                    ready_by_task.setdefault(ready_block.task_id, []).append(
+                        ready_block
+                    )
+            else:
+                updated_tasks.update(self.release_block(block))
 
-            for upstream_task in task.requires():
-                self.__init_task(upstream_task)
+        for task_id, ready_blocks in ready_by_task.items():
+            record = self._tasks[task_id]
+            task_queue = record.queue
+            for ready_block in ready_blocks:
+                task_queue.push_ready(ready_block)
+            task_state = record.state
+            task_state.ready_count += len(ready_blocks)
+            task_state.pending_count -= len(ready_blocks)
+            self._ready_task_ids.add(task_id)
+            updated_tasks[task_id] = task_state
+        return updated_tasks
+
+    def __init_task(self, task, roots):
+        task_id = task.task_id
+        if task_id in self._tasks:
+            # already registered through another downstream task; in
+            # particular, do not enumerate its dependencies again
+            return
+
+        num_roots, root_gen = roots.get(task_id, (0, None))
+        task_state = TaskState()
+        task_state.ready_count = num_roots
+        num_blocks = self.dependency_graph.num_blocks(task_id)
+        task_state.total_block_count = num_blocks
+        # root blocks are already ready, everything else is pending
+        task_state.pending_count = num_blocks - num_roots
+        task_queue = ProcessingQueue(num_roots, root_gen, task.num_workers)
 
-    def __queue_ready_block(self, block, index=None):
-        if index is None:
-            self.task_queues[block.task_id].ready_queue.append(block)
+        self._tasks[task_id] = TaskRecord(task, task_state, task_queue)
+        self.task_map[task_id] = task
+        self.task_states[task_id] = task_state
+        self.task_queues[task_id] = task_queue
+        if num_roots > 0:
+            self._ready_task_ids.add(task_id)
+
+        for upstream_task in task.requires():
+            self.__init_task(upstream_task, roots)
+
+    def __queue_ready_block(self, block, retry=False):
+        task_id = block.task_id
+        record = self._tasks[task_id]
+        if retry:
+            record.queue.push_retry(block)
         else:
-            self.task_queues[block.task_id].ready_queue.insert(index, block)
-        self.task_states[block.task_id].ready_count += 1
+            record.queue.push_ready(block)
+        record.state.ready_count += 1
+        self._ready_task_ids.add(task_id)
 
     def __remove_from_processing_blocks(self, block):
-        self.task_queues[block.task_id].processing_blocks.remove(block.block_id)
-        self.task_states[block.task_id].processing_count -= 1
+        record = self._tasks[block.task_id]
+        record.queue.processing_blocks.remove(block.block_id)
+        record.state.processing_count -= 1
 
     def __update_ready_queue(self, ready_blocks):
         updated_tasks = {}
         for ready_block in ready_blocks:
             self.__queue_ready_block(ready_block)
-            task_state = self.task_states[ready_block.task_id]
+            task_state = self._tasks[ready_block.task_id].state
+            task_state.pending_count -= 1
             updated_tasks[ready_block.task_id] = task_state
         return updated_tasks
 
     def __precheck(self, block):
+        record = self._tasks[block.task_id]
+        # compare by identity: the same block object does not need to be
+        # checked again, and Block.__eq__ would be more expensive
+        if record.last_precheck_block is block:
+            return record.last_precheck_ret
         try:
             # pre_check can intermittently fail
             # so we wrap it in a try block
-            if self.task_map[block.task_id].check_function is not None:
-                return self.task_map[block.task_id].check_function(block)
+            check_function = record.check_function
+            if check_function is not None:
+                ret = check_function(block)
             else:
-                return False
+                ret = False
         except Exception:
             logger.exception(f"pre_check() exception for block {block.block_id}")
-            return False
+            ret = False
+        record.last_precheck_block = block
+        record.last_precheck_ret = ret
+        return ret
@@ -22,15 +22,10 @@ class SerialServer(ServerObservee):
         process_funcs = {task.task_id: task.process_function for task in tasks}
 
         while True:
-            ready_tasks = scheduler.get_ready_tasks()
             if finished_tasks == all_tasks:
                 break
             else:
-                block = None
-                for ready_task in ready_tasks:
-                    block = scheduler.acquire_block(ready_task.task_id)
-                    if block is not None:
-                        break
+                block = scheduler.acquire_block_any()
                 if block is None:
                     break
                 if block.task_id not in started_tasks:
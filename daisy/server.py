@@ -135,7 +135,9 @@ class Server(ServerObservee):
 
         logger.debug("Current task state: %s", task_state)
 
-        block = self.scheduler.acquire_block(message.task_id)
+        block = self.scheduler.acquire_block(
+            message.task_id, getattr(message, "worker_id", None)
+        )
 
         if block is None:
 
@@ -274,10 +276,18 @@ class Server(ServerObservee):
     def _check_for_lost_blocks(self):
 
         lost_blocks = self.block_bookkeeper.get_lost_blocks()
+        if not lost_blocks:
+            return
 
-        # mark as failed and release the lost blocks
+        # mark as failed and release the lost blocks in one batch
         for block in lost_blocks:
-
             logger.error("Block %s was lost, returning it to scheduler", block)
             block.status = BlockStatus.FAILED
-            self._release_block(block)
+
+        self.scheduler.release_blocks(lost_blocks)
+        task_states = self.scheduler.task_states
+        for block in lost_blocks:
+            self.notify_release_block(block.task_id, task_states[block.task_id])
+
+        self._check_all_tasks_completed()
+        self._recruit_workers()
@@ -1,10 +1,22 @@
 class TaskState:
+    __slots__ = (
+        "started",
+        "total_block_count",
+        "pending_count",
+        "ready_count",
+        "processing_count",
+        "completed_count",
+        "skipped_count",
+        "failed_count",
+        "orphaned_count",
+    )
+
     def __init__(self):
         self.started = False
         self.total_block_count = 0
 
         # counts correspond with BlockStatus
-        # self.pending_count = 0
+        self.pending_count = 0
         self.ready_count = 0
         self.processing_count = 0
         self.completed_count = 0
@@ -12,17 +24,6 @@ class TaskState:
         self.failed_count = 0
         self.orphaned_count = 0
 
-    @property
-    def pending_count(self):
-        # Pending count can include orphaned nodes
-        return self.total_block_count - (
-            self.ready_count
-            + self.completed_count
-            + self.failed_count
-            + self.orphaned_count
-            + self.processing_count
-        )
-
     def is_done(self):
         return (
             self.total_block_count
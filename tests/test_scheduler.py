@@ -250,63 +250,59 @@ def test_simple_release_block(task_1d):
 def test_complete_task(task_2d):
     scheduler = Scheduler([task_2d])
 
-    # test Level 1
-    blocks = []
-    for b in (12, 23, 25, 40):
-        block = scheduler.acquire_block(task_2d.task_id)
-        block.status = BlockStatus.SUCCESS
-        assert block.block_id == ("test_2d", b)
-        blocks.append(block)
+    # each level is a set of blocks that are safe to run in parallel; the
+    # order within a level is up to the scheduler
+    levels = (
+        (12, 23, 25, 40),
+        (8, 17, 19, 32),
+        (7, 16, 18, 31),
+        (4, 11, 13, 24),
+    )
+    for level in levels:
+        blocks = []
+        for _ in level:
+            block = scheduler.acquire_block(task_2d.task_id)
+            block.status = BlockStatus.SUCCESS
+            blocks.append(block)
+
+        assert set(block.block_id for block in blocks) == set(
+            ("test_2d", b) for b in level
+        )
 
-    # first task should not have any available blocks
-    assert scheduler.acquire_block(task_2d.task_id) is None
+        # first task should not have any available blocks
+        assert scheduler.acquire_block(task_2d.task_id) is None
 
-    for block in blocks:
-        scheduler.release_block(block)
+        for block in blocks:
+            scheduler.release_block(block)
 
-    # test Level 2
-    blocks = []
-    for b in (8, 17, 19, 32):
-        block = scheduler.acquire_block(task_2d.task_id)
-        block.status = BlockStatus.SUCCESS
-        assert block.block_id == ("test_2d", b)
-        blocks.append(block)
+    assert scheduler.task_states[task_2d.task_id].is_done()
 
-    # first task should not have any available blocks
-    assert scheduler.acquire_block(task_2d.task_id) is None
 
-    for block in blocks:
-        scheduler.release_block(block)
+def test_release_blocks_batched(task_2d):
+    scheduler = Scheduler([task_2d])
 
-    # test Level 3
     blocks = []
-    for b in (7, 16, 18, 31):
+    for _ in range(4):
         block = scheduler.acquire_block(task_2d.task_id)
         block.status = BlockStatus.SUCCESS
-        assert block.block_id == ("test_2d", b)
         blocks.append(block)
 
-    # first task should not have any available blocks
-    assert scheduler.acquire_block(task_2d.task_id) is None
+    updated_tasks = scheduler.release_blocks(blocks)
 
-    for block in blocks:
-        scheduler.release_block(block)
+    assert set(updated_tasks) == {task_2d.task_id}
+    task_state = scheduler.task_states[task_2d.task_id]
+    assert task_state.completed_count == 4
+    assert task_state.ready_count == 4
 
-    # test Level 4
+    # the next level should now be available
     blocks = []
-    for b in (4, 11, 13, 24):
+    for _ in range(4):
         block = scheduler.acquire_block(task_2d.task_id)
-        block.status = BlockStatus.SUCCESS
-        assert block.block_id == ("test_2d", b)
+        assert block is not None
         blocks.append(block)
-
-    # first task should not have any available blocks
-    assert scheduler.acquire_block(task_2d.task_id) is None
-
-    for block in blocks:
-        scheduler.release_block(block)
-
-    assert scheduler.task_states[task_2d.task_id].is_done()
+    assert set(block.block_id for block in blocks) == set(
+        ("test_2d", b) for b in (8, 17, 19, 32)
+    )
 
 
 def test_downstream(chained_task):
@@ -422,33 +418,35 @@ def test_chained_tasks(chained_task):
     assert scheduler.acquire_block(second_task.task_id) is None
 
     # test Level 4
-    blocks = []
+    blocks = {}
     for b in (4, 11, 13, 24):
         block = scheduler.acquire_block(first_task.task_id)
         block.status = BlockStatus.SUCCESS
-        blocks.append(block)
+        blocks[block.block_id] = block
+
+    assert set(blocks) == set(("first", b) for b in (4, 11, 13, 24))
 
     # releasing (first, 24) should free (second, 12)
-    scheduler.release_block(blocks[-1])
+    scheduler.release_block(blocks[("first", 24)])
     block = scheduler.acquire_block(second_task.task_id)
     block.status = BlockStatus.SUCCESS
     assert block.block_id == ("second", 12)
     scheduler.release_block(block)
 
     # releasing (first, 13) should free (second, 8)
-    scheduler.release_block(blocks[-2])
+    scheduler.release_block(blocks[("first", 13)])
     block = scheduler.acquire_block(second_task.task_id)
     block.status = BlockStatus.SUCCESS
     scheduler.release_block(block)
     # releasing (first, 11) should free (second, 7)
-    scheduler.release_block(blocks[-3])
+    scheduler.release_block(blocks[("first", 11)])
     block = scheduler.acquire_block(second_task.task_id)
     block.status = BlockStatus.SUCCESS
     assert block.block_id == ("second", 7)
     scheduler.release_block(block)
 
     # releasing (first, 4) should free (second, 4)
-    scheduler.release_block(blocks[-4])
+    scheduler.release_block(blocks[("first", 4)])
     assert scheduler.task_states[first_task.task_id].is_done()
     block = scheduler.acquire_block(second_task.task_id)
     block.status = BlockStatus.SUCCESS